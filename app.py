@@ -1,5 +1,7 @@
 # app.py
 import os
+import atexit
+import concurrent.futures
 import uuid
 import time
 import json
@@ -11,8 +13,13 @@ import google.generativeai as genai
 import requests
 import boto3
 import threading
-from flask import Flask, render_template, request, jsonify
+from concurrent.futures import ThreadPoolExecutor
+from flask import Flask, Response, render_template, request, jsonify, stream_with_context
 from dotenv import load_dotenv
+from gemini_batcher import MicroBatcher
+from ontology_glossary import OntologyGlossary, GlossaryStats
+from local_asr import LocalModelPool, transcribe_audio_local
+from translation_memory import TranslationMemory
 
 # Load environment variables from .env file
 load_dotenv()
@@ -35,6 +42,40 @@ azure_endpoint = os.getenv("AZURE_ENDPOINT")
 # Configure the Gemini API
 genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
 
+# Gemini micro-batching configuration (a max size of 1 disables batching)
+gemini_batch_max_size = int(os.getenv("GEMINI_BATCH_MAX_SIZE", "8"))
+gemini_batch_max_wait_ms = float(os.getenv("GEMINI_BATCH_MAX_WAIT_MS", "30"))
+gemini_batch_max_concurrency = int(os.getenv("GEMINI_BATCH_MAX_CONCURRENCY", "32"))
+gemini_batch_timeout_s = float(os.getenv("GEMINI_BATCH_TIMEOUT_S", "60"))
+
+# Whether the web page streams Gemini output (/stop-recording-stream, not batched)
+# or waits for the complete translation (/stop-recording, micro-batched)
+ui_streaming = os.getenv("UI_STREAMING", "true").lower() == "true"
+
+# Local CPU speech recognition, enabled per input language (e.g. "ta-IN,en-US")
+local_asr_languages = {code.strip() for code in os.getenv("LOCAL_ASR_LANGUAGES", "").split(",") if code.strip()}
+local_asr_pool = LocalModelPool(
+    model_name=os.getenv("LOCAL_ASR_MODEL", "small"),
+    compute_type=os.getenv("LOCAL_ASR_COMPUTE_TYPE", "int8"),
+    pool_size=int(os.getenv("LOCAL_ASR_POOL_SIZE", "1")),
+    cpu_threads=int(os.getenv("LOCAL_ASR_CPU_THREADS", "0")),
+)
+# Load the models at import, so gunicorn/uvicorn workers are warm before their first request
+if local_asr_languages and local_asr_pool.available():
+    try:
+        local_asr_pool.warm_up()
+    except Exception as e:
+        logger.error(f"Local ASR warm-up failed, models will load on first use: {str(e)}")
+
+# Fuzzy translation memory configuration
+translation_memory_enabled = os.getenv("TRANSLATION_MEMORY", "true").lower() == "true"
+translation_memory_threshold = float(os.getenv("TRANSLATION_MEMORY_THRESHOLD", "0.7"))
+translation_memory_path = os.getenv("TRANSLATION_MEMORY_PATH")
+
+# Ontology glossary pre-pass configuration
+glossary_prepass_enabled = os.getenv("GLOSSARY_PREPASS", "true").lower() == "true"
+glossary_skip_max_words = int(os.getenv("GLOSSARY_SKIP_MAX_WORDS", "8"))
+
 # Initialize S3 and Transcribe clients
 s3_client = boto3.client(
     "s3",
@@ -60,6 +101,10 @@ current_english_text = None
 is_recording = False
 audio_frames = []
 
+# Ontology used for context-aware corrections
+ONTOLOGY_PATH = "./Polyhouse Ontology.ttl"
+_ontology_text = None
+
 # List of supported languages for AWS Transcribe
 SUPPORTED_INPUT_LANGUAGES = {
     "te-IN": "Telugu",
@@ -155,15 +200,38 @@ def transcribe_audio(job_name, file_uri, language_code="te-IN"):
         logger.error(f"Transcription error: {str(e)}")
         return None
 
-def correct_and_translate(source_text, source_lang):
-    """Translates source text to English using Gemini API with context awareness."""
-    try:
-        f = open("./Polyhouse Ontology.ttl", "r")
-        onto = f.read()
-        # Create a prompt for the Gemini model
-
-        
-        prompt = f"""
+def load_ontology():
+    """Reads the ontology file once and reuses it for every prompt."""
+    global _ontology_text
+    if _ontology_text is None:
+        with open(ONTOLOGY_PATH, "r") as f:
+            _ontology_text = f.read()
+    return _ontology_text
+
+ontology_glossary = None
+if glossary_prepass_enabled:
+    ontology_glossary = OntologyGlossary.from_ttl(
+        ONTOLOGY_PATH,
+        languages=SUPPORTED_INPUT_LANGUAGES,
+        skip_max_words=glossary_skip_max_words,
+    )
+glossary_stats = GlossaryStats()
+
+def run_glossary_prepass(source_text, source_lang):
+    """Matches ontology terms in the transcript and records whether Gemini can be skipped."""
+    result = ontology_glossary.apply(source_text, source_lang)
+    glossary_stats.record_prepass(result)
+    if result.confident:
+        logger.info(f"Glossary pre-pass skipped Gemini in {result.elapsed * 1e6:.0f}us: {result.english_text}")
+    elif result.matches:
+        logger.info(f"Glossary hints: {result.hints()}")
+    return result
+
+def build_correction_prompt(source_text, source_lang, hints=None):
+    """Builds the Gemini prompt that corrects and translates a transcript."""
+    onto = load_ontology()
+    hint_text = f"Likely ontology terms in the text: {'; '.join(hints)}" if hints else ""
+    return f"""
         I'll give you an ontology file and a {SUPPORTED_INPUT_LANGUAGES.get(source_lang, 'unknown language')} text. The {SUPPORTED_INPUT_LANGUAGES.get(source_lang, 'unknown language')} text might have errors related to specific terms in the ontology.
 
         First, analyze the ontology file to understand its domain and key terms.
@@ -173,9 +241,197 @@ def correct_and_translate(source_text, source_lang):
         Ontology file:
         {onto}
 
+        {hint_text}
         Tamil text: {source_text}
         """
 
+def build_batch_correction_prompt(items):
+    """Builds one Gemini prompt that corrects and translates several transcripts, keyed by id."""
+    onto = load_ontology()
+    entries = []
+    for item_id, (source_text, source_lang, hints) in enumerate(items):
+        entry = {
+            "id": str(item_id),
+            "language": SUPPORTED_INPUT_LANGUAGES.get(source_lang, 'unknown language'),
+            "text": source_text,
+        }
+        if hints:
+            entry["likely_ontology_terms"] = hints
+        entries.append(entry)
+    return f"""
+        I'll give you an ontology file and a JSON list of transcripts. Each transcript has an id, a language, a text and sometimes the ontology terms it likely contains. The texts might have errors related to specific terms in the ontology.
+
+        First, analyze the ontology file to understand its domain and key terms.
+        Then, examine each text for words that might be misused or misspelled based on context.
+        Finally, return ONLY a JSON object that maps each id to the corrected English translation of its text. Don't include any explanations or additional text.
+
+        Ontology file:
+        {onto}
+
+        Transcripts:
+        {json.dumps(entries, ensure_ascii=False)}
+        """
+
+def parse_batch_correction_response(text):
+    """Parses the id -> translation JSON object returned for a batch prompt."""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[len("json"):]
+    parsed = json.loads(text)
+    if not isinstance(parsed, dict):
+        raise ValueError("Batch response is not a JSON object")
+    return {str(key): value for key, value in parsed.items()}
+
+def pick_batch_results(items, response):
+    """Returns (results, missing ids) for a batch response; missing items need a single request.
+
+    Every item is missing when the response can't be parsed.
+    """
+    try:
+        parsed = parse_batch_correction_response(response.text)
+    except ValueError as e:
+        logging.error(f"Unparseable batch response, falling back to single requests: {str(e)}")
+        parsed = {}
+
+    results = [None] * len(items)
+    missing = []
+    for item_id in range(len(items)):
+        translated_text = parsed.get(str(item_id))
+        if isinstance(translated_text, str) and translated_text.strip():
+            translated_text = translated_text.strip()
+            logging.info(f"Translated to English: {translated_text}")
+            results[item_id] = translated_text
+        else:
+            missing.append(item_id)
+    return results, missing
+
+def _correct_and_translate_batch(items):
+    """Runs one Gemini call for a batch of (source_text, source_lang, hints) items.
+
+    Items missing from the response, or every item when the response can't be
+    parsed, fall back to an individual correct_and_translate_single call. An API
+    error (quota, timeout) fails the whole batch instead: retrying item by item
+    would multiply the load on an API that is already refusing requests.
+    """
+    if len(items) == 1:
+        return [correct_and_translate_single(*items[0])]
+
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    response = model.generate_content(build_batch_correction_prompt(items))
+    results, missing = pick_batch_results(items, response)
+
+    # Fallbacks run side by side so no caller waits for the others' round-trips
+    if missing:
+        with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+            fallbacks = executor.map(lambda item_id: correct_and_translate_single(*items[item_id]), missing)
+            for item_id, translated_text in zip(missing, fallbacks):
+                results[item_id] = translated_text
+    return results
+
+correction_batcher = None
+if gemini_batch_max_size > 1:
+    correction_batcher = MicroBatcher(
+        _correct_and_translate_batch,
+        max_batch_size=gemini_batch_max_size,
+        max_wait_ms=gemini_batch_max_wait_ms,
+        max_concurrent_batches=gemini_batch_max_concurrency,
+    )
+
+def _load_translation_memory():
+    """Loads TRANSLATION_MEMORY_PATH in the background; entries become usable as they are indexed."""
+    try:
+        if os.path.exists(translation_memory_path):
+            logger.info(f"Loaded {translation_memory.load(translation_memory_path)} translation memory entries")
+        translation_memory_loaded.set()
+    except Exception as e:
+        logger.error(f"Translation memory load failed, it won't be saved on exit: {str(e)}")
+
+def _save_translation_memory():
+    # Saving a partly loaded memory would drop the entries that weren't loaded yet
+    if translation_memory_loaded.is_set():
+        logger.info(f"Saved {translation_memory.save(translation_memory_path)} translation memory entries")
+    else:
+        logger.error("Translation memory still loading at exit; not saving it.")
+
+translation_memory = None
+translation_memory_loaded = threading.Event()
+if translation_memory_enabled:
+    translation_memory = TranslationMemory(threshold=translation_memory_threshold)
+    if translation_memory_path:
+        threading.Thread(target=_load_translation_memory, name="translation-memory-load", daemon=True).start()
+        atexit.register(_save_translation_memory)
+
+def recall_english_translation(source_text, source_lang):
+    """Returns a remembered English translation of a near-identical transcript, or None."""
+    if translation_memory is None:
+        return None
+    hit = translation_memory.lookup(source_text, source_lang)
+    if hit is None:
+        return None
+    entry, similarity = hit
+    logger.info(f"Translation memory hit ({similarity:.2f}) for '{source_text}': {entry.english_text}")
+    return entry.english_text
+
+def remember_english_translation(source_text, source_lang, english_text):
+    """Stores a successful Gemini translation in the translation memory."""
+    if translation_memory is not None and english_text and not english_text.startswith("Error"):
+        translation_memory.add(source_text, source_lang, english_text)
+
+def recall_target_translation(english_text, target_lang):
+    """Returns a remembered target-language translation of near-identical English text, or None."""
+    if translation_memory is None:
+        return None
+    hit = translation_memory.lookup_translation(english_text, target_lang)
+    if hit is None:
+        return None
+    translated_text, similarity = hit
+    logger.info(f"Translation memory hit ({similarity:.2f}) for {target_lang}: {translated_text}")
+    return translated_text
+
+def remember_target_translation(english_text, target_lang, translated_text):
+    """Stores a successful Azure translation in the translation memory."""
+    if translation_memory is not None and translated_text and not translated_text.startswith("Error"):
+        translation_memory.add_translation(english_text, target_lang, translated_text)
+
+def uses_local_asr(language_code):
+    """Whether this input language is transcribed on the box instead of AWS Transcribe."""
+    return language_code in local_asr_languages and local_asr_pool.available()
+
+def correct_and_translate(source_text, source_lang):
+    """Translates source text to English, batching concurrent requests into one Gemini call.
+
+    The ontology glossary pre-pass runs first; when the transcript is a short English
+    command made only of exact ontology terms and command words, it is returned as is
+    without calling Gemini.
+    """
+    hints = None
+    if ontology_glossary is not None:
+        prepass = run_glossary_prepass(source_text, source_lang)
+        if prepass.confident:
+            return prepass.english_text
+        hints = prepass.hints() or None
+
+    started = time.perf_counter()
+    try:
+        if correction_batcher is None:
+            return correct_and_translate_single(source_text, source_lang, hints)
+        return correction_batcher.submit((source_text, source_lang, hints)).result(timeout=gemini_batch_timeout_s)
+    except concurrent.futures.TimeoutError:
+        logging.error(f"Translation timed out after {gemini_batch_timeout_s:.0f}s")
+        return "Error: Translation timed out."
+    except Exception as e:
+        logging.error(f"Translation error: {str(e)}")
+        return f"Error: {str(e)}"
+    finally:
+        glossary_stats.record_llm_call(time.perf_counter() - started)
+
+def correct_and_translate_single(source_text, source_lang, hints=None):
+    """Translates source text to English using Gemini API with context awareness."""
+    try:
+        # Create a prompt for the Gemini model
+        prompt = build_correction_prompt(source_text, source_lang, hints)
 
         # Set up the model
         model = genai.GenerativeModel("gemini-1.5-flash")
@@ -195,6 +451,30 @@ def correct_and_translate(source_text, source_lang):
         logging.error(f"Translation error: {str(e)}")
         return f"Error: {str(e)}"
 
+def correct_and_translate_stream(source_text, source_lang):
+    """Yields the English translation piece by piece as Gemini generates it.
+
+    Streaming requests bypass the micro-batcher, since a batched response can't be
+    split per caller until it is complete. The glossary pre-pass still applies.
+    """
+    hints = None
+    if ontology_glossary is not None:
+        prepass = run_glossary_prepass(source_text, source_lang)
+        if prepass.confident:
+            yield prepass.english_text
+            return
+        hints = prepass.hints() or None
+
+    started = time.perf_counter()
+    try:
+        model = genai.GenerativeModel("gemini-1.5-flash")
+        response = model.generate_content(build_correction_prompt(source_text, source_lang, hints), stream=True)
+        for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    finally:
+        glossary_stats.record_llm_call(time.perf_counter() - started)
+
 def translate_to_target_language(english_text, target_lang):
     """Translates English text to target language using Azure Translator."""
     try:
@@ -230,34 +510,53 @@ def translate_to_target_language(english_text, target_lang):
         logging.error(f"Translation error: {str(e)}")
         return f"Error: {str(e)}"
 
-def process_audio(audio_path, input_language):
-    """Processes audio file: validates, uploads to S3, transcribes, and translates."""
-    global current_session_id, current_english_text
+def transcribe_recording(audio_path, input_language):
+    """Validates and transcribes a recording, returning (source_text, None) or (None, error result)."""
+    global current_session_id
 
-    try:
-        # Validate the recorded WAV file
-        if not validate_wav_file(audio_path):
-            logger.error("Invalid WAV file. Exiting.")
-            return {"status": "error", "message": "Invalid WAV file"}
+    # Validate the recorded WAV file
+    if not validate_wav_file(audio_path):
+        logger.error("Invalid WAV file. Exiting.")
+        return None, {"status": "error", "message": "Invalid WAV file"}
+
+    session_id = str(uuid.uuid4())
+    current_session_id = session_id
 
+    if uses_local_asr(input_language):
+        # Transcribe on the box, skipping the S3 upload and job polling
+        source_text = transcribe_audio_local(local_asr_pool, session_id, audio_path, input_language)
+    else:
         # Upload to S3
-        session_id = str(uuid.uuid4())
-        current_session_id = session_id
         s3_file_name = f"{session_id}.wav"
         s3_uri = f"s3://{bucket_name}/{s3_file_name}"
 
         if not upload_to_s3(audio_path, bucket_name, s3_file_name):
             logger.error("Failed to upload to S3. Exiting.")
-            return {"status": "error", "message": "Failed to upload to S3"}
+            return None, {"status": "error", "message": "Failed to upload to S3"}
 
         # Transcribe the audio
         source_text = transcribe_audio(session_id, s3_uri, input_language)
-        if not source_text or not source_text.strip():
-            logger.error("Transcription failed.")
-            return {"status": "error", "message": "Transcription failed"}
 
-        # Translate to English using Gemini
-        english_text = correct_and_translate(source_text, input_language)
+    if not source_text or not source_text.strip():
+        logger.error("Transcription failed.")
+        return None, {"status": "error", "message": "Transcription failed"}
+
+    return source_text, None
+
+def process_audio(audio_path, input_language):
+    """Processes audio file: validates, uploads to S3, transcribes, and translates."""
+    global current_english_text
+
+    try:
+        source_text, error = transcribe_recording(audio_path, input_language)
+        if error:
+            return error
+
+        # Reuse a remembered translation, or translate to English using Gemini
+        english_text = recall_english_translation(source_text, input_language)
+        if english_text is None:
+            english_text = correct_and_translate(source_text, input_language)
+            remember_english_translation(source_text, input_language, english_text)
         if not english_text:
             logger.error("Translation to English failed.")
             return {"status": "error", "message": "Translation to English failed"}
@@ -276,12 +575,62 @@ def process_audio(audio_path, input_language):
         logger.error(f"Error processing audio: {str(e)}")
         return {"status": "error", "message": f"Error: {str(e)}"}
 
+def process_audio_stream(audio_path, input_language):
+    """Like process_audio, but yields events so the English translation can be shown as it is generated.
+
+    Yields {"type": "source"} once the transcript is ready, {"type": "token"} for each
+    piece of the translation, and finally {"type": "done"} carrying the same result
+    dict process_audio would return.
+    """
+    global current_english_text
+
+    try:
+        source_text, error = transcribe_recording(audio_path, input_language)
+        if error:
+            yield {"type": "done", **error}
+            return
+
+        yield {"type": "source", "source_text": source_text}
+
+        english_text = recall_english_translation(source_text, input_language)
+        if english_text is not None:
+            yield {"type": "token", "text": english_text}
+        else:
+            pieces = []
+            for piece in correct_and_translate_stream(source_text, input_language):
+                pieces.append(piece)
+                yield {"type": "token", "text": piece}
+
+            english_text = "".join(pieces).strip()
+            remember_english_translation(source_text, input_language, english_text)
+
+        if not english_text:
+            logger.error("Translation to English failed.")
+            yield {"type": "done", "status": "error", "message": "Translation to English failed"}
+            return
+
+        # Store the final English text for later use
+        current_english_text = english_text
+        logging.info(f"Translated to English: {english_text}")
+
+        yield {
+            "type": "done",
+            "status": "success",
+            "source_text": source_text,
+            "english_text": english_text
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing audio: {str(e)}")
+        yield {"type": "done", "status": "error", "message": f"Error: {str(e)}"}
+
 # Flask routes
 @app.route('/')
 def index():
     return render_template('index.html', 
                           input_languages=SUPPORTED_INPUT_LANGUAGES, 
-                          output_languages=SUPPORTED_OUTPUT_LANGUAGES)
+                          output_languages=SUPPORTED_OUTPUT_LANGUAGES,
+                          streaming=ui_streaming)
 
 @app.route('/start-recording', methods=['POST'])
 def start_recording():
@@ -323,26 +672,30 @@ def start_recording():
         logger.error(f"Recording error: {str(e)}")
         return jsonify({"status": "error", "message": f"Error: {str(e)}"})
 
+def save_recording():
+    """Saves the recorded frames as a WAV file and returns its path."""
+    output_file = os.path.join(app.config['UPLOAD_FOLDER'], "recorded_audio.wav")
+    CHANNELS = 1
+    RATE = 44100
+
+    with wave.open(output_file, "wb") as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(2)  # 2 bytes for paInt16
+        wf.setframerate(RATE)
+        wf.writeframes(b"".join(audio_frames))
+
+    logger.info(f"Audio saved to {output_file}")
+    return output_file
+
 @app.route('/stop-recording', methods=['POST'])
 def stop_recording():
-    global is_recording, audio_frames
+    global is_recording
 
     try:
         is_recording = False
 
         # Save the recorded data as a WAV file
-        output_file = os.path.join(app.config['UPLOAD_FOLDER'], "recorded_audio.wav")
-        FORMAT = pyaudio.paInt16
-        CHANNELS = 1
-        RATE = 44100
-
-        with wave.open(output_file, "wb") as wf:
-            wf.setnchannels(CHANNELS)
-            wf.setsampwidth(2)  # 2 bytes for paInt16
-            wf.setframerate(RATE)
-            wf.writeframes(b"".join(audio_frames))
-
-        logger.info(f"Audio saved to {output_file}")
+        output_file = save_recording()
 
         # Process the audio
         input_language = request.form.get('input_language', 'te-IN')
@@ -353,6 +706,26 @@ def stop_recording():
         logger.error(f"Error stopping recording: {str(e)}")
         return jsonify({"status": "error", "message": f"Error: {str(e)}"})
 
+@app.route('/stop-recording-stream', methods=['POST'])
+def stop_recording_stream():
+    """Stops recording and streams processing events as newline-delimited JSON."""
+    global is_recording
+
+    try:
+        is_recording = False
+        output_file = save_recording()
+        input_language = request.form.get('input_language', 'te-IN')
+
+        def generate():
+            for event in process_audio_stream(output_file, input_language):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    except Exception as e:
+        logger.error(f"Error stopping recording: {str(e)}")
+        return jsonify({"type": "done", "status": "error", "message": f"Error: {str(e)}"})
+
 @app.route('/translate-to-language', methods=['POST'])
 def translate_to_language():
     try:
@@ -365,7 +738,10 @@ def translate_to_language():
         if not target_language:
             return jsonify({"status": "error", "message": "No target language specified"})
             
-        translated_text = translate_to_target_language(current_english_text, target_language)
+        translated_text = recall_target_translation(current_english_text, target_language)
+        if translated_text is None:
+            translated_text = translate_to_target_language(current_english_text, target_language)
+            remember_target_translation(current_english_text, target_language, translated_text)
         
         if translated_text:
             return jsonify({
@@ -380,5 +756,35 @@ def translate_to_language():
         logger.error(f"Translation error: {str(e)}")
         return jsonify({"status": "error", "message": f"Error: {str(e)}"})
 
+@app.route('/glossary-stats', methods=['GET'])
+def glossary_stats_report():
+    return jsonify(glossary_stats.snapshot())
+
+@app.route('/translation-memory/export', methods=['GET'])
+def export_translation_memory():
+    """Exports the translation memory as JSON Lines."""
+    if translation_memory is None:
+        return jsonify({"status": "error", "message": "Translation memory is disabled"})
+
+    lines = (json.dumps(entry, ensure_ascii=False) + "\n" for entry in translation_memory.export_entries())
+    return Response(lines, mimetype="application/x-ndjson")
+
+@app.route('/translation-memory/import', methods=['POST'])
+def import_translation_memory():
+    """Bulk-imports JSON Lines entries from an uploaded file or the request body."""
+    try:
+        if translation_memory is None:
+            return jsonify({"status": "error", "message": "Translation memory is disabled"})
+
+        upload = request.files.get('file')
+        body = upload.read() if upload else request.get_data()
+        lines = body.decode("utf-8").splitlines()
+        imported = translation_memory.import_entries(json.loads(line) for line in lines if line.strip())
+        return jsonify({"status": "success", "imported": imported, "total": len(translation_memory)})
+
+    except Exception as e:
+        logger.error(f"Translation memory import error: {str(e)}")
+        return jsonify({"status": "error", "message": f"Error: {str(e)}"})
+
 if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,230 @@
+# asgi.py
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import uuid
+import wave
+import pyaudio
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.templating import Jinja2Templates
+import async_pipeline
+from app import (
+    SUPPORTED_INPUT_LANGUAGES,
+    SUPPORTED_OUTPUT_LANGUAGES,
+    glossary_stats,
+    recall_target_translation,
+    remember_target_translation,
+    translation_memory,
+    ui_streaming,
+)
+
+logger = logging.getLogger("multilingual_translator")
+
+UPLOAD_FOLDER = 'uploads'
+os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+
+templates = Jinja2Templates(directory="templates")
+
+# Recording state per recording id, so concurrent browser sessions don't share frames or files
+recordings = {}
+
+def _recording_id(form):
+    """Returns the page's recording id, falling back to a shared id for clients that don't send one."""
+    try:
+        return str(uuid.UUID(form.get('recording_id', '')))
+    except ValueError:
+        return "default"
+
+def _record_until_stopped(recording):
+    """Reads microphone chunks until the recording is deactivated (runs in a worker thread)."""
+    FORMAT = pyaudio.paInt16
+    CHANNELS = 1
+    RATE = 44100
+    CHUNK = 1024
+
+    audio = pyaudio.PyAudio()
+    stream = audio.open(
+        format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK
+    )
+    logger.info("Recording started...")
+
+    while recording["active"]:
+        data = stream.read(CHUNK)
+        recording["frames"].append(data)
+
+    stream.stop_stream()
+    stream.close()
+    audio.terminate()
+    logger.info("Recording stopped.")
+
+def _save_recording(output_file, frames):
+    with wave.open(output_file, "wb") as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)  # 2 bytes for paInt16
+        wf.setframerate(44100)
+        wf.writeframes(b"".join(frames))
+
+async def _stop_and_save(form):
+    """Stops the form's recording and saves it to a WAV file of its own."""
+    recording_id = _recording_id(form)
+    recording = recordings.pop(recording_id, None)
+    if recording is None:
+        raise ValueError("No active recording")
+    recording["active"] = False
+
+    output_file = os.path.join(UPLOAD_FOLDER, f"recorded_audio_{recording_id}.wav")
+    await asyncio.to_thread(_save_recording, output_file, recording["frames"])
+    logger.info(f"Audio saved to {output_file}")
+    return output_file
+
+def _remove_recording(output_file):
+    with contextlib.suppress(OSError):
+        os.remove(output_file)
+
+async def index(request):
+    return templates.TemplateResponse(request, 'index.html', {
+        "input_languages": SUPPORTED_INPUT_LANGUAGES,
+        "output_languages": SUPPORTED_OUTPUT_LANGUAGES,
+        "streaming": ui_streaming,
+    })
+
+async def start_recording(request):
+    try:
+        form = await request.form()
+        recording = {"active": True, "frames": []}
+        recordings[_recording_id(form)] = recording
+        await asyncio.to_thread(_record_until_stopped, recording)
+        return JSONResponse({"status": "success", "message": "Recording stopped successfully."})
+
+    except Exception as e:
+        logger.error(f"Recording error: {str(e)}")
+        return JSONResponse({"status": "error", "message": f"Error: {str(e)}"})
+
+async def stop_recording(request):
+    try:
+        form = await request.form()
+        output_file = await _stop_and_save(form)
+
+        input_language = form.get('input_language', 'te-IN')
+        try:
+            result = await async_pipeline.process_audio_async(output_file, input_language)
+        finally:
+            _remove_recording(output_file)
+        return JSONResponse(result)
+
+    except Exception as e:
+        logger.error(f"Error stopping recording: {str(e)}")
+        return JSONResponse({"status": "error", "message": f"Error: {str(e)}"})
+
+async def stop_recording_stream(request):
+    """Stops recording and streams processing events as newline-delimited JSON."""
+    try:
+        form = await request.form()
+        output_file = await _stop_and_save(form)
+        input_language = form.get('input_language', 'te-IN')
+
+        async def generate():
+            try:
+                async for event in async_pipeline.process_audio_stream_async(output_file, input_language):
+                    yield json.dumps(event, ensure_ascii=False) + "\n"
+            finally:
+                _remove_recording(output_file)
+
+        return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+    except Exception as e:
+        logger.error(f"Error stopping recording: {str(e)}")
+        return JSONResponse({"type": "done", "status": "error", "message": f"Error: {str(e)}"})
+
+async def translate_to_language(request):
+    try:
+        data = await request.json()
+        target_language = data.get('target_language')
+        session_id = data.get('session_id')
+
+        if session_id:
+            english_text = async_pipeline.session_english_text.get(session_id)
+        else:
+            english_text = async_pipeline.current_english_text
+
+        if not english_text:
+            return JSONResponse({"status": "error", "message": "No English text available for translation"})
+
+        if not target_language:
+            return JSONResponse({"status": "error", "message": "No target language specified"})
+
+        translated_text = recall_target_translation(english_text, target_language)
+        if translated_text is None:
+            translated_text = await async_pipeline.translate_to_target_language_async(english_text, target_language)
+            remember_target_translation(english_text, target_language, translated_text)
+
+        if translated_text:
+            return JSONResponse({
+                "status": "success",
+                "translated_text": translated_text,
+                "target_language": SUPPORTED_OUTPUT_LANGUAGES.get(target_language, target_language)
+            })
+        else:
+            return JSONResponse({"status": "error", "message": "Translation failed"})
+
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        return JSONResponse({"status": "error", "message": f"Error: {str(e)}"})
+
+async def glossary_stats_report(request):
+    return JSONResponse(glossary_stats.snapshot())
+
+async def export_translation_memory(request):
+    """Exports the translation memory as JSON Lines."""
+    if translation_memory is None:
+        return JSONResponse({"status": "error", "message": "Translation memory is disabled"})
+
+    lines = (json.dumps(entry, ensure_ascii=False) + "\n" for entry in translation_memory.export_entries())
+    return StreamingResponse(lines, media_type="application/x-ndjson")
+
+async def import_translation_memory(request):
+    """Bulk-imports JSON Lines entries from an uploaded file or the request body."""
+    try:
+        if translation_memory is None:
+            return JSONResponse({"status": "error", "message": "Translation memory is disabled"})
+
+        if request.headers.get("content-type", "").startswith("multipart/form-data"):
+            form = await request.form()
+            body = await form["file"].read()
+        else:
+            body = await request.body()
+        lines = body.decode("utf-8").splitlines()
+        imported = await asyncio.to_thread(
+            translation_memory.import_entries, [json.loads(line) for line in lines if line.strip()]
+        )
+        return JSONResponse({"status": "success", "imported": imported, "total": len(translation_memory)})
+
+    except Exception as e:
+        logger.error(f"Translation memory import error: {str(e)}")
+        return JSONResponse({"status": "error", "message": f"Error: {str(e)}"})
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    await async_pipeline.open_clients()
+    try:
+        yield
+    finally:
+        await async_pipeline.close_clients()
+
+app = Starlette(
+    routes=[
+        Route('/', index),
+        Route('/start-recording', start_recording, methods=['POST']),
+        Route('/stop-recording', stop_recording, methods=['POST']),
+        Route('/stop-recording-stream', stop_recording_stream, methods=['POST']),
+        Route('/translate-to-language', translate_to_language, methods=['POST']),
+        Route('/glossary-stats', glossary_stats_report, methods=['GET']),
+        Route('/translation-memory/export', export_translation_memory, methods=['GET']),
+        Route('/translation-memory/import', import_translation_memory, methods=['POST']),
+    ],
+    lifespan=lifespan,
+)
@@ -0,0 +1,392 @@
+# async_pipeline.py
+import asyncio
+import contextlib
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+import aioboto3
+import httpx
+import google.generativeai as genai
+from gemini_batcher import AsyncMicroBatcher
+from local_asr import transcribe_audio_local
+from app import (
+    aws_access_key_id,
+    aws_secret_access_key,
+    aws_region,
+    bucket_name,
+    azure_api_key,
+    azure_region,
+    build_batch_correction_prompt,
+    build_correction_prompt,
+    gemini_batch_max_concurrency,
+    gemini_batch_max_size,
+    gemini_batch_max_wait_ms,
+    gemini_batch_timeout_s,
+    glossary_stats,
+    local_asr_pool,
+    recall_english_translation,
+    remember_english_translation,
+    ontology_glossary,
+    pick_batch_results,
+    run_glossary_prepass,
+    uses_local_asr,
+    validate_wav_file,
+)
+
+logger = logging.getLogger("multilingual_translator")
+
+# Seconds between transcription job status checks
+TRANSCRIBE_POLL_INTERVAL = 5
+
+# Long-lived clients shared by every in-flight session
+_client_stack = None
+s3_client = None
+transcribe_client = None
+http_client = None
+
+# Batches concurrent corrections on the event loop, so no thread waits on Gemini
+correction_batcher = None
+
+# English text per session, so concurrent sessions don't overwrite each other
+MAX_STORED_SESSIONS = 1000
+session_english_text = OrderedDict()
+current_session_id = None
+current_english_text = None
+
+async def open_clients():
+    """Opens the shared S3, Transcribe and HTTP clients and starts the correction batcher."""
+    global _client_stack, s3_client, transcribe_client, http_client, correction_batcher
+
+    if _client_stack is not None:
+        return
+
+    session = aioboto3.Session(
+        aws_access_key_id=aws_access_key_id,
+        aws_secret_access_key=aws_secret_access_key,
+        region_name=aws_region,
+    )
+    stack = contextlib.AsyncExitStack()
+    s3_client = await stack.enter_async_context(session.client("s3"))
+    transcribe_client = await stack.enter_async_context(session.client("transcribe"))
+    http_client = await stack.enter_async_context(httpx.AsyncClient(timeout=30))
+    if gemini_batch_max_size > 1:
+        correction_batcher = AsyncMicroBatcher(
+            _correct_and_translate_batch_async,
+            max_batch_size=gemini_batch_max_size,
+            max_wait_ms=gemini_batch_max_wait_ms,
+            max_concurrent_batches=gemini_batch_max_concurrency,
+        )
+        correction_batcher.start()
+        stack.push_async_callback(correction_batcher.close)
+    _client_stack = stack
+    logger.info("Async clients opened.")
+
+async def close_clients():
+    """Closes the shared clients and the batcher opened by open_clients()."""
+    global _client_stack, s3_client, transcribe_client, http_client, correction_batcher
+
+    if _client_stack is None:
+        return
+
+    await _client_stack.aclose()
+    _client_stack = None
+    s3_client = transcribe_client = http_client = correction_batcher = None
+    logger.info("Async clients closed.")
+
+def remember_english_text(session_id, english_text):
+    """Stores a session's English text, dropping the oldest sessions past the cap."""
+    session_english_text[session_id] = english_text
+    while len(session_english_text) > MAX_STORED_SESSIONS:
+        session_english_text.popitem(last=False)
+
+async def upload_to_s3_async(file_path, bucket, object_name):
+    """Uploads a file to an S3 bucket without blocking the event loop."""
+    try:
+        logger.info(f"Uploading {file_path} to S3...")
+        data = await asyncio.to_thread(_read_file, file_path)
+        await s3_client.put_object(Bucket=bucket, Key=object_name, Body=data)
+        logger.info("File uploaded to S3 successfully.")
+        return True
+    except Exception as e:
+        logger.error(f"Failed to upload to S3: {str(e)}")
+        return False
+
+def _read_file(file_path):
+    with open(file_path, "rb") as file_data:
+        return file_data.read()
+
+async def transcribe_audio_async(job_name, file_uri, language_code="te-IN"):
+    """Transcribes an audio file using Amazon Transcribe, polling with asyncio.sleep."""
+    try:
+        await transcribe_client.start_transcription_job(
+            TranscriptionJobName=job_name,
+            Media={"MediaFileUri": file_uri},
+            MediaFormat="wav",
+            LanguageCode=language_code,
+        )
+        logger.info(f"Started transcription job: {job_name}")
+
+        while True:
+            job = await transcribe_client.get_transcription_job(TranscriptionJobName=job_name)
+            status = job["TranscriptionJob"]["TranscriptionJobStatus"]
+            logger.info(f"Job status: {status}")
+
+            if status == "COMPLETED":
+                transcript_uri = job["TranscriptionJob"]["Transcript"]["TranscriptFileUri"]
+                response = await http_client.get(transcript_uri)
+                data = json.loads(response.content)
+
+                if "results" in data and "transcripts" in data["results"] and data["results"]["transcripts"]:
+                    text = data["results"]["transcripts"][0]["transcript"]
+                    if text:
+                        logger.info(f"Transcription completed: {text}")
+                        return text
+                    else:
+                        logger.error("Transcription returned empty text.")
+                        return None
+                else:
+                    logger.error(f"Unexpected transcript format: {data}")
+                    return None
+
+            elif status == "FAILED":
+                error_reason = job["TranscriptionJob"].get("FailureReason", "Unknown reason")
+                logger.error(f"Transcription failed: {error_reason}")
+                return None
+
+            await asyncio.sleep(TRANSCRIBE_POLL_INTERVAL)
+
+    except Exception as e:
+        logger.error(f"Transcription error: {str(e)}")
+        return None
+
+async def correct_and_translate_async(source_text, source_lang):
+    """Translates source text to English using the async Gemini API.
+
+    When micro-batching is enabled the request joins the event-loop batcher, which
+    sends one generate_content_async call per batch. The ontology glossary pre-pass
+    runs first and can skip the Gemini call entirely.
+    """
+    hints = None
+    if ontology_glossary is not None:
+        prepass = run_glossary_prepass(source_text, source_lang)
+        if prepass.confident:
+            return prepass.english_text
+        hints = prepass.hints() or None
+
+    started = time.perf_counter()
+    try:
+        if correction_batcher is None:
+            return await correct_and_translate_single_async(source_text, source_lang, hints)
+        return await asyncio.wait_for(
+            correction_batcher.submit((source_text, source_lang, hints)), gemini_batch_timeout_s
+        )
+    except asyncio.TimeoutError:
+        logger.error(f"Translation timed out after {gemini_batch_timeout_s:.0f}s")
+        return "Error: Translation timed out."
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        return f"Error: {str(e)}"
+    finally:
+        glossary_stats.record_llm_call(time.perf_counter() - started)
+
+async def correct_and_translate_single_async(source_text, source_lang, hints=None):
+    """Translates one transcript to English with its own generate_content_async call."""
+    try:
+        prompt = build_correction_prompt(source_text, source_lang, hints)
+        model = genai.GenerativeModel("gemini-1.5-flash")
+        response = await model.generate_content_async(prompt)
+
+        if response and hasattr(response, 'text'):
+            translated_text = response.text.strip()
+            logger.info(f"Translated to English: {translated_text}")
+            return translated_text
+        else:
+            logger.error("Error: No valid response from the model.")
+            return "Error: No valid translation received."
+
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        return f"Error: {str(e)}"
+
+async def _correct_and_translate_batch_async(items):
+    """Async counterpart of app._correct_and_translate_batch.
+
+    Parse failures and missing ids fall back to single calls run together with
+    asyncio.gather; API errors fail the whole batch.
+    """
+    if len(items) == 1:
+        return [await correct_and_translate_single_async(*items[0])]
+
+    model = genai.GenerativeModel("gemini-1.5-flash")
+    response = await model.generate_content_async(build_batch_correction_prompt(items))
+    results, missing = pick_batch_results(items, response)
+
+    if missing:
+        fallbacks = await asyncio.gather(*(correct_and_translate_single_async(*items[item_id]) for item_id in missing))
+        for item_id, translated_text in zip(missing, fallbacks):
+            results[item_id] = translated_text
+    return results
+
+async def correct_and_translate_stream_async(source_text, source_lang):
+    """Yields the English translation piece by piece from the async streaming Gemini API."""
+    hints = None
+    if ontology_glossary is not None:
+        prepass = run_glossary_prepass(source_text, source_lang)
+        if prepass.confident:
+            yield prepass.english_text
+            return
+        hints = prepass.hints() or None
+
+    started = time.perf_counter()
+    try:
+        model = genai.GenerativeModel("gemini-1.5-flash")
+        response = await model.generate_content_async(
+            build_correction_prompt(source_text, source_lang, hints), stream=True
+        )
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    finally:
+        glossary_stats.record_llm_call(time.perf_counter() - started)
+
+async def translate_to_target_language_async(english_text, target_lang):
+    """Translates English text to target language using Azure Translator over async HTTP."""
+    try:
+        constructed_url = "https://api.cognitive.microsofttranslator.com/translate"
+
+        params = {
+            'api-version': '3.0',
+            'from': 'en',
+            'to': target_lang
+        }
+
+        headers = {
+            'Ocp-Apim-Subscription-Key': azure_api_key,
+            'Ocp-Apim-Subscription-Region': azure_region,
+            'Content-type': 'application/json'
+        }
+
+        body = [{'text': english_text}]
+
+        response = await http_client.post(constructed_url, params=params, headers=headers, json=body)
+
+        if response.status_code == 200:
+            translated_text = response.json()[0]["translations"][0]["text"]
+            logger.info(f"Translated to {target_lang}: {translated_text}")
+            return translated_text
+        else:
+            logger.error(f"Azure Translation failed: {response.text}")
+            return "Error: Translation failed."
+
+    except Exception as e:
+        logger.error(f"Translation error: {str(e)}")
+        return f"Error: {str(e)}"
+
+async def transcribe_recording_async(audio_path, input_language):
+    """Validates and transcribes a recording, returning (session_id, source_text, None) or an error result."""
+    global current_session_id
+
+    if not await asyncio.to_thread(validate_wav_file, audio_path):
+        logger.error("Invalid WAV file. Exiting.")
+        return None, None, {"status": "error", "message": "Invalid WAV file"}
+
+    session_id = str(uuid.uuid4())
+    current_session_id = session_id
+
+    if uses_local_asr(input_language):
+        source_text = await asyncio.to_thread(
+            transcribe_audio_local, local_asr_pool, session_id, audio_path, input_language
+        )
+    else:
+        s3_file_name = f"{session_id}.wav"
+        s3_uri = f"s3://{bucket_name}/{s3_file_name}"
+
+        if not await upload_to_s3_async(audio_path, bucket_name, s3_file_name):
+            logger.error("Failed to upload to S3. Exiting.")
+            return None, None, {"status": "error", "message": "Failed to upload to S3"}
+
+        source_text = await transcribe_audio_async(session_id, s3_uri, input_language)
+
+    if not source_text or not source_text.strip():
+        logger.error("Transcription failed.")
+        return None, None, {"status": "error", "message": "Transcription failed"}
+
+    return session_id, source_text, None
+
+async def process_audio_async(audio_path, input_language):
+    """Async counterpart of app.process_audio: validates, uploads, transcribes and translates."""
+    global current_english_text
+
+    try:
+        session_id, source_text, error = await transcribe_recording_async(audio_path, input_language)
+        if error:
+            return error
+
+        english_text = recall_english_translation(source_text, input_language)
+        if english_text is None:
+            english_text = await correct_and_translate_async(source_text, input_language)
+            remember_english_translation(source_text, input_language, english_text)
+        if not english_text:
+            logger.error("Translation to English failed.")
+            return {"status": "error", "message": "Translation to English failed"}
+
+        remember_english_text(session_id, english_text)
+        current_english_text = english_text
+
+        return {
+            "status": "success",
+            "session_id": session_id,
+            "source_text": source_text,
+            "english_text": english_text
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing audio: {str(e)}")
+        return {"status": "error", "message": f"Error: {str(e)}"}
+
+async def process_audio_stream_async(audio_path, input_language):
+    """Async counterpart of app.process_audio_stream, yielding source, token and done events."""
+    global current_english_text
+
+    try:
+        session_id, source_text, error = await transcribe_recording_async(audio_path, input_language)
+        if error:
+            yield {"type": "done", **error}
+            return
+
+        yield {"type": "source", "session_id": session_id, "source_text": source_text}
+
+        english_text = recall_english_translation(source_text, input_language)
+        if english_text is not None:
+            yield {"type": "token", "text": english_text}
+        else:
+            pieces = []
+            async for piece in correct_and_translate_stream_async(source_text, input_language):
+                pieces.append(piece)
+                yield {"type": "token", "text": piece}
+
+            english_text = "".join(pieces).strip()
+            remember_english_translation(source_text, input_language, english_text)
+
+        if not english_text:
+            logger.error("Translation to English failed.")
+            yield {"type": "done", "status": "error", "message": "Translation to English failed"}
+            return
+
+        remember_english_text(session_id, english_text)
+        current_english_text = english_text
+        logger.info(f"Translated to English: {english_text}")
+
+        yield {
+            "type": "done",
+            "status": "success",
+            "session_id": session_id,
+            "source_text": source_text,
+            "english_text": english_text
+        }
+
+    except Exception as e:
+        logger.error(f"Error processing audio: {str(e)}")
+        yield {"type": "done", "status": "error", "message": f"Error: {str(e)}"}
@@ -0,0 +1,68 @@
+# benchmark_asr.py
+import argparse
+import statistics
+import time
+import uuid
+import wave
+from app import (
+    bucket_name,
+    local_asr_pool,
+    transcribe_audio,
+    upload_to_s3,
+)
+from local_asr import transcribe_audio_local
+
+def audio_duration(path):
+    with wave.open(path, "rb") as wav_file:
+        return wav_file.getnframes() / wav_file.getframerate()
+
+def run_local(path, language):
+    return transcribe_audio_local(local_asr_pool, f"bench-{uuid.uuid4()}", path, language)
+
+def run_cloud(path, language):
+    job_name = f"bench-{uuid.uuid4()}"
+    object_name = f"{job_name}.wav"
+    if not upload_to_s3(path, bucket_name, object_name):
+        return None
+    return transcribe_audio(job_name, f"s3://{bucket_name}/{object_name}", language)
+
+def benchmark(name, run, files, language, repeats):
+    latencies = []
+    factors = []
+    for path in files:
+        duration = audio_duration(path)
+        for _ in range(repeats):
+            started = time.perf_counter()
+            text = run(path, language)
+            elapsed = time.perf_counter() - started
+            latencies.append(elapsed)
+            factors.append(elapsed / duration if duration else 0.0)
+            print(f"{name:5} {path}: {elapsed:.2f}s (RTF {factors[-1]:.2f}) -> {text!r}")
+
+    print(
+        f"{name:5} median latency {statistics.median(latencies):.2f}s, "
+        f"max {max(latencies):.2f}s, median RTF {statistics.median(factors):.2f}"
+    )
+
+def main():
+    """Compares latency and real-time factor of the local ASR engine against AWS Transcribe."""
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("files", nargs="+", help="WAV files to transcribe")
+    parser.add_argument("--language", default="te-IN", help="Input language code (default: te-IN)")
+    parser.add_argument("--repeats", type=int, default=3, help="Runs per file and engine (default: 3)")
+    parser.add_argument("--skip-cloud", action="store_true", help="Only benchmark the local engine")
+    args = parser.parse_args()
+
+    if not local_asr_pool.available():
+        parser.error("faster-whisper is not installed; install it to benchmark the local engine")
+
+    started = time.perf_counter()
+    local_asr_pool.warm_up()
+    print(f"local model load: {time.perf_counter() - started:.2f}s (paid once per process)")
+
+    benchmark("local", run_local, args.files, args.language, args.repeats)
+    if not args.skip_cloud:
+        benchmark("cloud", run_cloud, args.files, args.language, args.repeats)
+
+if __name__ == "__main__":
+    main()
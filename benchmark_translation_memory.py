@@ -0,0 +1,105 @@
+# benchmark_translation_memory.py
+import argparse
+import random
+import statistics
+import time
+from translation_memory import TranslationMemory
+
+VERBS = ["open", "close", "turn on", "turn off", "check", "read", "start", "stop", "show", "reset"]
+DEVICES = [
+    "vent", "turbovent", "fan", "door", "roof", "camera", "humidity sensor", "temperature sensor",
+    "sht25", "esp32", "spresense", "sim7600", "controller", "wall", "ramp", "grid", "site", "storey",
+]
+PLACES = ["in polyhouse", "on storey", "in grid", "at site", "near ramp", "by the wall"]
+FILLERS = ["please", "now", "the", "can you", "kindly"]
+SYLLABLES = ["ka", "lo", "mi", "ra", "ven", "sto", "tu", "pel", "dor", "an", "si", "mar", "ko", "ne", "bri", "ul"]
+
+def make_vocabulary(rng, size):
+    """Pseudo-words standing in for the open-ended part of real commands (names, notes, crops)."""
+    words = set()
+    while len(words) < size:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+def make_utterance(rng, vocabulary):
+    """Builds a synthetic command from a small command vocabulary plus one open-ended word.
+
+    No numbers are added, so only the verb's polarity partitions the index and the
+    memory has to tell thousands of similar commands apart by their words, as it
+    does for real traffic.
+    """
+    words = [rng.choice(VERBS), "the", rng.choice(DEVICES), rng.choice(PLACES), rng.choice(vocabulary)]
+    return " ".join(words)
+
+def perturb(rng, text):
+    """Adds filler words and a typo, the way spoken transcripts of the same command differ."""
+    words = text.split()
+    words.insert(rng.randrange(len(words) + 1), rng.choice(FILLERS))
+    candidates = [i for i, word in enumerate(words) if word.isalpha() and len(word) > 5]
+    if candidates:
+        target = rng.choice(candidates)
+        word = words[target]
+        cut = rng.randrange(1, len(word) - 1)
+        words[target] = word[:cut] + word[cut + 1:]
+    return " ".join(words)
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    """Measures translation memory lookup latency, recall and wrong-hit rate with a large number of stored entries.
+
+    The near-duplicate hit rate is the recall: how often a reworded, misspelled
+    command reuses its stored translation. Every hit on an unseen command is wrong.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument("--entries", type=int, default=100_000, help="Entries to store (default: 100000)")
+    parser.add_argument("--queries", type=int, default=2_000, help="Lookups to time (default: 2000)")
+    parser.add_argument("--threshold", type=float, default=0.7, help="Similarity threshold (default: 0.7)")
+    parser.add_argument("--bucket-size", type=int, default=16, help="LSH bucket cap (default: 16)")
+    parser.add_argument("--vocabulary", type=int, default=5_000, help="Open-ended words (default: 5000)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    memory = TranslationMemory(threshold=args.threshold, max_bucket_size=args.bucket_size)
+    vocabulary = make_vocabulary(rng, args.vocabulary)
+
+    utterances = list(dict.fromkeys(make_utterance(rng, vocabulary) for _ in range(args.entries)))
+    stored = set(utterances)
+    started = time.perf_counter()
+    for text in utterances:
+        memory.add(text, "en-US", text, {"ta": f"ta:{text}"})
+    print(f"indexed {len(memory)} entries in {time.perf_counter() - started:.1f}s")
+
+    def unseen():
+        while True:
+            text = make_utterance(rng, vocabulary)
+            if text not in stored:
+                return text, None
+
+    def near_duplicate():
+        text = rng.choice(utterances)
+        return perturb(rng, text), text
+
+    for label, make_query in (("near-duplicate", near_duplicate), ("unseen", unseen)):
+        queries = [make_query() for _ in range(args.queries)]
+        timings = []
+        hits = wrong = 0
+        for query, expected in queries:
+            started = time.perf_counter()
+            hit = memory.lookup(query, "en-US")
+            timings.append(time.perf_counter() - started)
+            if hit is not None:
+                hits += 1
+                wrong += hit[0].english_text != expected
+
+        print(
+            f"{label:15} median {1e6 * statistics.median(timings):.0f}us, "
+            f"p99 {1e6 * percentile(timings, 0.99):.0f}us, "
+            f"hit rate {hits / len(queries):.1%} (correct {(hits - wrong) / len(queries):.1%}), "
+            f"wrong hits {wrong / len(queries):.1%}"
+        )
+
+if __name__ == "__main__":
+    main()
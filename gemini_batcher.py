@@ -0,0 +1,168 @@
+# gemini_batcher.py
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+logger = logging.getLogger("multilingual_translator")
+
+class MicroBatcher:
+    """Collects concurrent requests for a short window and hands them to one handler call.
+
+    `handler` receives a list of request payloads and must return a list of results
+    in the same order. A batch is dispatched once `max_batch_size` items are waiting
+    or `max_wait_ms` has passed since the first item arrived, whichever comes first.
+    Up to `max_concurrent_batches` batches are in flight at once. Requests whose
+    future was cancelled before their batch is dispatched are left out of it.
+    """
+
+    def __init__(self, handler, max_batch_size=8, max_wait_ms=30, max_concurrent_batches=32):
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, float(max_wait_ms)) / 1000.0
+        self._queue = queue.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_concurrent_batches, thread_name_prefix="micro-batch"
+        )
+        self._collector = threading.Thread(target=self._collect, name="micro-batch-collector", daemon=True)
+        self._collector.start()
+
+    def submit(self, payload):
+        """Queues a request and returns a Future resolved with its result."""
+        future = Future()
+        self._queue.put((payload, future))
+        return future
+
+    def _collect(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_wait
+
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch):
+        # A cancelled future (e.g. an asyncio caller that went away) can't take a result
+        batch = [(payload, future) for payload, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        payloads = [payload for payload, _ in batch]
+        logger.info(f"Dispatching batch of {len(batch)} request(s)")
+
+        try:
+            results = self.handler(payloads)
+            if len(results) != len(batch):
+                raise ValueError(f"Handler returned {len(results)} results for {len(batch)} requests")
+        except Exception as e:
+            logger.error(f"Batch handler error: {str(e)}")
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
+
+class AsyncMicroBatcher:
+    """asyncio counterpart of MicroBatcher for coroutine handlers.
+
+    Batches are collected and dispatched as tasks on the event loop that called
+    `start()`, so waiting on Gemini ties up no threads. Up to
+    `max_concurrent_batches` batches are in flight at once. A caller that is
+    cancelled before its batch is dispatched is left out of the batch.
+    """
+
+    def __init__(self, handler, max_batch_size=8, max_wait_ms=30, max_concurrent_batches=32):
+        self.handler = handler
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0, float(max_wait_ms)) / 1000.0
+        self.max_concurrent_batches = max(1, int(max_concurrent_batches))
+        self._queue = None
+        self._slots = None
+        self._collector = None
+        self._tasks = set()
+
+    def start(self):
+        """Starts the collector task on the running event loop."""
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.max_concurrent_batches)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def close(self):
+        """Stops collecting, cancels in-flight batches and any requests still queued."""
+        tasks = [self._collector, *self._tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        while not self._queue.empty():
+            _, future = self._queue.get_nowait()
+            future.cancel()
+
+    async def submit(self, payload):
+        """Queues a request and waits for its result."""
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, future))
+        return await future
+
+    async def _collect(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+
+            try:
+                while len(batch) < self.max_batch_size:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+
+                await self._slots.acquire()
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            task = asyncio.create_task(self._dispatch(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _dispatch(self, batch):
+        try:
+            batch = [(payload, future) for payload, future in batch if not future.done()]
+            if not batch:
+                return
+            payloads = [payload for payload, _ in batch]
+            logger.info(f"Dispatching async batch of {len(batch)} request(s)")
+
+            try:
+                results = await self.handler(payloads)
+                if len(results) != len(batch):
+                    raise ValueError(f"Handler returned {len(results)} results for {len(batch)} requests")
+            except asyncio.CancelledError:
+                for _, future in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                logger.error(f"Batch handler error: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        finally:
+            self._slots.release()
@@ -0,0 +1,106 @@
+# local_asr.py
+import contextlib
+import logging
+import queue
+import threading
+import time
+
+try:
+    from faster_whisper import WhisperModel
+except ImportError:  # The local engine is optional; the cloud path works without it
+    WhisperModel = None
+
+logger = logging.getLogger("multilingual_translator")
+
+class LocalModelPool:
+    """Keeps loaded speech-recognition models alive across requests.
+
+    Models are loaded lazily on first use and then handed out from a queue, so
+    at most `pool_size` transcriptions run concurrently and no request pays the
+    model load cost after the pool is warm.
+    """
+
+    def __init__(self, model_name="small", compute_type="int8", pool_size=1, cpu_threads=0):
+        self.model_name = model_name
+        self.compute_type = compute_type
+        self.pool_size = max(1, int(pool_size))
+        self.cpu_threads = int(cpu_threads)
+        self._models = queue.Queue()
+        self._loaded = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def available():
+        return WhisperModel is not None
+
+    def _load(self):
+        started = time.perf_counter()
+        model = WhisperModel(
+            self.model_name,
+            device="cpu",
+            compute_type=self.compute_type,
+            cpu_threads=self.cpu_threads,
+        )
+        logger.info(
+            f"Loaded local ASR model '{self.model_name}' ({self.compute_type}) in {time.perf_counter() - started:.2f}s"
+        )
+        return model
+
+    def warm_up(self):
+        """Loads every model in the pool up front."""
+        with self._lock:
+            while self._loaded < self.pool_size:
+                self._models.put(self._load())
+                self._loaded += 1
+
+    @contextlib.contextmanager
+    def acquire(self):
+        """Borrows a loaded model, loading a new one if the pool isn't full yet."""
+        model = None
+        with self._lock:
+            if self._models.empty() and self._loaded < self.pool_size:
+                self._loaded += 1
+                try:
+                    model = self._load()
+                except Exception:
+                    self._loaded -= 1
+                    raise
+        if model is None:
+            model = self._models.get()
+        try:
+            yield model
+        finally:
+            self._models.put(model)
+
+def transcribe_audio_local(pool, job_name, audio_path, language_code="te-IN"):
+    """Transcribes a local audio file on the CPU; mirrors app.transcribe_audio's return contract."""
+    if not pool.available():
+        logger.error("Local ASR requested but faster-whisper is not installed.")
+        return None
+
+    try:
+        started = time.perf_counter()
+        with pool.acquire() as model:
+            segments, info = model.transcribe(
+                audio_path,
+                language=language_code.split("-")[0],
+                beam_size=1,
+                vad_filter=True,
+            )
+            text = " ".join(segment.text.strip() for segment in segments).strip()
+
+        elapsed = time.perf_counter() - started
+        logger.info(
+            f"Local transcription {job_name} took {elapsed:.2f}s for {info.duration:.2f}s of audio"
+        )
+
+        if text:
+            logger.info(f"Transcription completed: {text}")
+            return text
+        else:
+            logger.error("Transcription returned empty text.")
+            return None
+
+    except Exception as e:
+        logger.error(f"Local transcription error: {str(e)}")
+        return None
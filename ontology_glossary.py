@@ -0,0 +1,356 @@
+# ontology_glossary.py
+import functools
+import logging
+import re
+import threading
+import time
+import unicodedata
+
+logger = logging.getLogger("multilingual_translator")
+
+# Vocabulary prefixes whose names are never spoken as domain terms
+IGNORED_PREFIXES = {"rdf", "rdfs", "owl", "xsd", "xml"}
+
+# How Indic transcripts spell English loanwords used in the ontology, per input language.
+# Spellings follow spoken pronunciation ("camera" is कैमरा, not a letter-by-letter चमेर),
+# so they are curated rather than transliterated. Order: hi, ta, te, ml, kn.
+_LOANWORD_LANGUAGES = ("hi-IN", "ta-IN", "te-IN", "ml-IN", "kn-IN")
+_LOANWORD_TABLE = {
+    "building": ("बिल्डिंग", "பில்டிங்", "బిల్డింగ్", "ബിൽഡിംഗ്", "ಬಿಲ್ಡಿಂಗ್"),
+    "camera": ("कैमरा", "கேமரா", "కెమెరా", "ക്യാമറ", "ಕ್ಯಾಮೆರಾ"),
+    "controller": ("कंट्रोलर", "கண்ட்ரோலர்", "కంట్రోలర్", "കൺട്രോളർ", "ಕಂಟ್ರೋಲರ್"),
+    "door": ("डोर", "டோர்", "డోర్", "ഡോർ", "ಡೋರ್"),
+    "fan": ("फैन", "ஃபேன்", "ఫ్యాన్", "ഫാൻ", "ಫ್ಯಾನ್"),
+    "grid": ("ग्रिड", "கிரிட்", "గ్రిడ్", "ഗ്രിഡ്", "ಗ್ರಿಡ್"),
+    "humidity": ("ह्यूमिडिटी", "ஹியூமிடிட்டி", "హ్యూమిడిటీ", "ഹ്യുമിഡിറ്റി", "ಹ್ಯುಮಿಡಿಟಿ"),
+    "polyhouse": ("पॉलीहाउस", "பாலிஹவுஸ்", "పాలీహౌస్", "പോളിഹൗസ്", "ಪಾಲಿಹೌಸ್"),
+    "ramp": ("रैंप", "ரேம்ப்", "ర్యాంప్", "റാമ്പ്", "ರ್ಯಾಂಪ್"),
+    "roof": ("रूफ", "ரூஃப்", "రూఫ్", "റൂഫ്", "ರೂಫ್"),
+    "sensor": ("सेंसर", "சென்சார்", "సెన్సార్", "സെൻസർ", "ಸೆನ್ಸಾರ್"),
+    "system": ("सिस्टम", "சிஸ்டம்", "సిస్టమ్", "സിസ്റ്റം", "ಸಿಸ್ಟಮ್"),
+    "temperature": ("टेम्परेचर", "டெம்பரேச்சர்", "టెంపరేచర్", "ടെമ്പറേച്ചർ", "ಟೆಂಪರೇಚರ್"),
+    "turbovent": ("टर्बोवेंट", "டர்போவென்ட்", "టర్బోవెంట్", "ടർബോവെന്റ്", "ಟರ್ಬೋವೆಂಟ್"),
+    "vent": ("वेंट", "வென்ட்", "వెంట్", "വെന്റ്", "ವೆಂಟ್"),
+    "wall": ("वॉल", "வால்", "వాల్", "വാൾ", "ವಾಲ್"),
+}
+LOANWORD_SPELLINGS = {
+    language: {word: spellings[i] for word, spellings in _LOANWORD_TABLE.items()}
+    for i, language in enumerate(_LOANWORD_LANGUAGES)
+}
+
+# Everyday command words that may surround exact terms in an utterance that skips Gemini
+COMMAND_WORDS = {
+    "a", "an", "the", "this", "that", "all", "of", "in", "on", "at", "to", "for", "from", "by",
+    "near", "and", "is", "are", "please", "now", "open", "close", "turn", "switch", "off",
+    "start", "stop", "check", "read", "show", "reset", "set", "increase", "decrease", "raise",
+    "lower", "status", "value", "level", "reading", "what", "whats",
+}
+
+# Endings that make a word an inflected form of a term rather than a misrecognition of it
+INFLECTION_SUFFIXES = ("s", "es", "ed", "d", "ing", "er", "ers")
+
+_TERM_PATTERN = re.compile(r'(?:^|[\s,;(])(?:([A-Za-z][\w-]*)?:([A-Za-z][\w-]*))')
+_LABEL_PATTERN = re.compile(r'rdfs:label\s+"([^"]+)"')
+_INSTANCE_SUFFIX = re.compile(r'(?:_\d+)+(?:_P\d+)?$')
+_END = "\0"
+
+# Fuzzy matching only spans this many words; longer spans must match exactly
+FUZZY_MAX_WORDS = 3
+MAX_EDITS = 2
+
+def split_local_name(name):
+    """Splits an ontology local name like 'Node_MCU_UART2_1_P1' or 'AudioVisualAppliance' into words."""
+    words = []
+    for part in re.split(r'[_\-\s]+', name):
+        words.extend(re.findall(r'[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+\d*|[A-Z]+\d*|\d+', part))
+    return words
+
+def tokenize(text):
+    """Splits text into (normalized, raw) word pairs, keeping Indic vowel signs intact."""
+    tokens = []
+    for raw in text.split():
+        token = "".join(ch for ch in raw if not unicodedata.category(ch).startswith("P"))
+        if token:
+            tokens.append((token.lower(), raw))
+    return tokens
+
+def _max_edits(length):
+    """Edit budget for a phrase of the given length; short words must match exactly."""
+    if length <= 4:
+        return 0
+    if length <= 8:
+        return 1
+    return 2
+
+def _deletions(key, max_edits):
+    """All strings reachable from key by deleting up to max_edits characters."""
+    found = {key}
+    frontier = {key}
+    for _ in range(max_edits):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        found |= frontier
+    return found
+
+def _is_inflection(spoken, key):
+    """Whether spoken is key with an inflectional ending added or removed ("doors" / "door")."""
+    return any(spoken == key + suffix or key == spoken + suffix for suffix in INFLECTION_SUFFIXES)
+
+def _edit_distance(a, b, max_edits):
+    """Levenshtein distance between a and b, stopping early once it exceeds max_edits."""
+    if abs(len(a) - len(b)) > max_edits:
+        return max_edits + 1
+    prev_row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, prev_row[j] + 1, prev_row[j - 1] + (ca != cb)))
+        if min(row) > max_edits:
+            return max_edits + 1
+        prev_row = row
+    return prev_row[-1]
+
+class GlossaryMatch:
+    """A transcript span that matched a glossary term exactly (distance 0) or fuzzily."""
+
+    def __init__(self, start, end, spoken, term, distance):
+        self.start = start
+        self.end = end
+        self.spoken = spoken
+        self.term = term
+        self.distance = distance
+        self.similarity = 1 - distance / max(len(spoken), 1)
+
+    def as_hint(self):
+        if self.distance:
+            return f"'{self.spoken}' may be a misrecognition of '{self.term}'"
+        return f"'{self.spoken}' refers to '{self.term}'"
+
+class GlossaryResult:
+    """Outcome of the glossary pre-pass over one transcript."""
+
+    def __init__(self, source_text, english_text, matches, confident, elapsed):
+        self.source_text = source_text
+        # The transcript itself when it can be used as the English text unchanged, else None
+        self.english_text = english_text
+        self.matches = matches
+        self.confident = confident
+        self.elapsed = elapsed
+
+    def hints(self):
+        return [match.as_hint() for match in self.matches]
+
+class OntologyGlossary:
+    """Compiled glossary of ontology terms held in character tries with fuzzy lookup.
+
+    Terms come from `rdfs:label` literals and the local names of ontology entities.
+    Each term is stored under its spoken forms (camel-case split, instance suffix
+    dropped, acronyms split from digits) and, for terms made of words listed in
+    LOANWORD_SPELLINGS, under their native-script spelling in each input language.
+
+    Fuzzy matches are only ever hints for Gemini: they never rewrite the transcript
+    and never let an utterance skip the Gemini call.
+    """
+
+    def __init__(self, terms, languages=(), skip_max_words=8):
+        self.skip_max_words = skip_max_words
+        self._tries = {None: {}}
+        self._deletions = {None: {}}
+        self._displays = {None: {}}
+        self._max_key_length = 0
+        self._fuzzy = functools.lru_cache(maxsize=4096)(self._fuzzy_uncached)
+
+        for display in terms:
+            for variant in self._spoken_variants(display):
+                self._insert(None, variant, display)
+
+        for language in languages:
+            spellings = LOANWORD_SPELLINGS.get(language)
+            if spellings is None:
+                continue
+            self._tries[language] = {}
+            self._deletions[language] = {}
+            self._displays[language] = {}
+            for display in terms:
+                words = display.lower().split()
+                if all(word in spellings or word.isdigit() for word in words):
+                    native = [spellings.get(word, word) for word in words]
+                    self._insert(language, " ".join(native), display)
+                    self._insert(language, "".join(native), display)
+
+    @classmethod
+    def from_ttl(cls, path, languages=(), **kwargs):
+        """Builds a glossary from a Turtle ontology file."""
+        with open(path, "r") as f:
+            return cls(cls.extract_terms(f.read()), languages=languages, **kwargs)
+
+    @staticmethod
+    def extract_terms(ttl):
+        """Returns the display forms of all labels and entity local names in a Turtle document."""
+        terms = set(_LABEL_PATTERN.findall(ttl))
+        for line in ttl.splitlines():
+            line = line.strip()
+            if not line or line.startswith(("#", "@prefix", "@base")):
+                continue
+            for prefix, local_name in _TERM_PATTERN.findall(line):
+                # Lower-case local names are properties (hasUnit, madeObservation), not spoken terms
+                if prefix in IGNORED_PREFIXES or not (local_name[0].isupper() or local_name[0].isdigit()):
+                    continue
+                words = split_local_name(local_name)
+                terms.add(" ".join(words))
+                core = _INSTANCE_SUFFIX.sub("", local_name)
+                if core != local_name:
+                    terms.add(" ".join(split_local_name(core)))
+        return sorted(term for term in terms if term)
+
+    @staticmethod
+    def _spoken_variants(display):
+        words = display.lower().split()
+        variants = {" ".join(words), "".join(words)}
+        # "ESP32" is usually recognised as "esp 32" or "e s p 32"
+        split_digits = []
+        for word in words:
+            split_digits.extend(re.findall(r'[a-z]+|\d+', word))
+        variants.add(" ".join(split_digits))
+        spelled = []
+        for part in split_digits:
+            if part.isalpha() and len(part) <= 4 and part.upper() in display:
+                spelled.extend(part)
+            else:
+                spelled.append(part)
+        variants.add(" ".join(spelled))
+        return variants
+
+    def _insert(self, language, key, display):
+        node = self._tries[language]
+        for ch in key:
+            node = node.setdefault(ch, {})
+        node[_END] = display
+        self._max_key_length = max(self._max_key_length, len(key))
+
+        index = self._deletions[language]
+        for deleted in _deletions(key, MAX_EDITS):
+            index.setdefault(deleted, set()).add(key)
+        self._displays[language][key] = display
+
+    def _longest_exact(self, language, tokens, start):
+        """Walks the trie across tokens from `start` and returns (end, display) of the longest term."""
+        node = self._tries[language]
+        found = None
+        for end in range(start, len(tokens)):
+            if end > start:
+                node = node.get(" ")
+                if node is None:
+                    break
+            for ch in tokens[end]:
+                node = node.get(ch)
+                if node is None:
+                    return found
+            if _END in node:
+                found = (end + 1, node[_END])
+        return found
+
+    def _fuzzy_uncached(self, language, key):
+        """Returns (distance, display) of the closest term within the edit budget, or None."""
+        max_edits = _max_edits(len(key))
+        if max_edits == 0 or len(key) > self._max_key_length + max_edits:
+            return None
+
+        index = self._deletions[language]
+        candidates = set()
+        for deleted in _deletions(key, max_edits):
+            candidates.update(index.get(deleted, ()))
+
+        # "sensors" is the plural of a term, not a misrecognition of one
+        if any(_is_inflection(key, candidate) for candidate in candidates):
+            return None
+
+        best = None
+        for candidate in candidates:
+            distance = _edit_distance(key, candidate, max_edits)
+            if distance <= max_edits and (best is None or distance < best[0]):
+                best = (distance, self._displays[language][candidate])
+        return best
+
+    def apply(self, source_text, source_lang):
+        """Finds glossary terms in a transcript and decides whether the LLM call can be skipped.
+
+        The call is only skipped for a short en-US utterance in which every word is
+        part of an exact term match, a command word or a number, with at least one term.
+        """
+        started = time.perf_counter()
+        tokens = [token for token, _ in tokenize(source_text)]
+        languages = [None]
+        if source_lang in self._tries:
+            languages.append(source_lang)
+
+        matches = []
+        uncovered = False
+        i = 0
+        while i < len(tokens):
+            found = None
+            for language in languages:
+                exact = self._longest_exact(language, tokens, i)
+                if exact and (found is None or exact[0] > found.end):
+                    found = GlossaryMatch(i, exact[0], " ".join(tokens[i:exact[0]]), exact[1], 0)
+
+            if found is None:
+                for length in range(min(FUZZY_MAX_WORDS, len(tokens) - i), 0, -1):
+                    spoken = " ".join(tokens[i:i + length])
+                    hits = [hit for hit in (self._fuzzy(language, spoken) for language in languages) if hit]
+                    if hits:
+                        distance, display = min(hits)
+                        found = GlossaryMatch(i, i + length, spoken, display, distance)
+                        break
+
+            if found is None:
+                uncovered = uncovered or not (tokens[i] in COMMAND_WORDS or tokens[i].isdigit())
+                i += 1
+                continue
+
+            matches.append(found)
+            uncovered = uncovered or found.distance > 0
+            i = found.end
+
+        confident = (
+            source_lang == "en-US"
+            and bool(matches)
+            and not uncovered
+            and len(tokens) <= self.skip_max_words
+        )
+        english_text = source_text if confident else None
+        return GlossaryResult(source_text, english_text, matches, confident, time.perf_counter() - started)
+
+class GlossaryStats:
+    """Tracks how often the glossary pre-pass skips the Gemini call and the latency that saves."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.total = 0
+        self.skipped = 0
+        self.prepass_seconds = 0.0
+        self.llm_calls = 0
+        self.llm_seconds = 0.0
+
+    def record_prepass(self, result):
+        with self._lock:
+            self.total += 1
+            self.prepass_seconds += result.elapsed
+            if result.confident:
+                self.skipped += 1
+
+    def record_llm_call(self, seconds):
+        with self._lock:
+            self.llm_calls += 1
+            self.llm_seconds += seconds
+
+    def snapshot(self):
+        with self._lock:
+            avg_llm = self.llm_seconds / self.llm_calls if self.llm_calls else 0.0
+            return {
+                "utterances": self.total,
+                "skipped_llm_calls": self.skipped,
+                "skip_rate": self.skipped / self.total if self.total else 0.0,
+                "avg_prepass_ms": 1000 * self.prepass_seconds / self.total if self.total else 0.0,
+                "avg_llm_ms": 1000 * avg_llm,
+                "estimated_latency_saved_ms": 1000 * avg_llm * self.skipped,
+            }
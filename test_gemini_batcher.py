@@ -0,0 +1,129 @@
+# test_gemini_batcher.py
+import asyncio
+import threading
+import time
+import pytest
+from gemini_batcher import AsyncMicroBatcher, MicroBatcher
+
+class RecordingHandler:
+    """Doubles each payload and remembers the batches it was called with."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, payloads):
+        self.batches.append(list(payloads))
+        return [payload * 2 for payload in payloads]
+
+def test_dispatches_when_batch_is_full():
+    handler = RecordingHandler()
+    batcher = MicroBatcher(handler, max_batch_size=3, max_wait_ms=10_000)
+    futures = [batcher.submit(i) for i in range(3)]
+    assert [future.result(timeout=1) for future in futures] == [0, 2, 4]
+    assert handler.batches == [[0, 1, 2]]
+
+def test_dispatches_after_deadline():
+    handler = RecordingHandler()
+    batcher = MicroBatcher(handler, max_batch_size=100, max_wait_ms=20)
+    started = time.monotonic()
+    futures = [batcher.submit(i) for i in range(2)]
+    assert [future.result(timeout=1) for future in futures] == [0, 2]
+    assert time.monotonic() - started < 1
+    assert handler.batches == [[0, 1]]
+
+def test_results_go_to_their_own_callers():
+    batcher = MicroBatcher(RecordingHandler(), max_batch_size=4, max_wait_ms=50)
+    results = {}
+
+    def call(value):
+        results[value] = batcher.submit(value).result(timeout=1)
+
+    threads = [threading.Thread(target=call, args=(value,)) for value in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert results == {value: value * 2 for value in range(10)}
+
+def test_handler_error_fails_every_future_in_the_batch():
+    def handler(payloads):
+        raise RuntimeError("quota exceeded")
+
+    batcher = MicroBatcher(handler, max_batch_size=2, max_wait_ms=10_000)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(RuntimeError, match="quota exceeded"):
+            future.result(timeout=1)
+
+def test_wrong_result_count_fails_the_batch():
+    batcher = MicroBatcher(lambda payloads: payloads[:1], max_batch_size=2, max_wait_ms=10_000)
+    futures = [batcher.submit(i) for i in range(2)]
+    for future in futures:
+        with pytest.raises(ValueError):
+            future.result(timeout=1)
+
+def test_cancelled_request_is_dropped_and_batch_mates_resolve():
+    handler = RecordingHandler()
+    batcher = MicroBatcher(handler, max_batch_size=100, max_wait_ms=100)
+    cancelled = batcher.submit(1)
+    kept = batcher.submit(2)
+    assert cancelled.cancel()
+    assert kept.result(timeout=1) == 4
+    assert handler.batches == [[2]]
+
+class AsyncRecordingHandler(RecordingHandler):
+    async def __call__(self, payloads):
+        await asyncio.sleep(0)
+        return super().__call__(payloads)
+
+def run_with_batcher(handler, scenario, **options):
+    async def main():
+        batcher = AsyncMicroBatcher(handler, **options)
+        batcher.start()
+        try:
+            return await asyncio.wait_for(scenario(batcher), 1)
+        finally:
+            await batcher.close()
+
+    return asyncio.run(main())
+
+def test_async_dispatches_when_batch_is_full():
+    handler = AsyncRecordingHandler()
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)))
+
+    assert run_with_batcher(handler, scenario, max_batch_size=3, max_wait_ms=10_000) == [0, 2, 4]
+    assert handler.batches == [[0, 1, 2]]
+
+def test_async_dispatches_after_deadline_in_order():
+    handler = AsyncRecordingHandler()
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+    assert run_with_batcher(handler, scenario, max_batch_size=100, max_wait_ms=20) == [0, 2, 4, 6, 8]
+    assert handler.batches == [[0, 1, 2, 3, 4]]
+
+def test_async_handler_error_fails_every_request_in_the_batch():
+    async def handler(payloads):
+        raise RuntimeError("quota exceeded")
+
+    async def scenario(batcher):
+        return await asyncio.gather(*(batcher.submit(i) for i in range(2)), return_exceptions=True)
+
+    results = run_with_batcher(handler, scenario, max_batch_size=2, max_wait_ms=10_000)
+    assert [str(result) for result in results] == ["quota exceeded", "quota exceeded"]
+
+def test_async_cancelled_request_is_dropped_and_batch_mates_resolve():
+    handler = AsyncRecordingHandler()
+
+    async def scenario(batcher):
+        cancelled = asyncio.create_task(batcher.submit(1))
+        kept = asyncio.create_task(batcher.submit(2))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        return await kept
+
+    assert run_with_batcher(handler, scenario, max_batch_size=100, max_wait_ms=50) == 4
+    assert handler.batches == [[2]]
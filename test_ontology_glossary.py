@@ -0,0 +1,51 @@
+# test_ontology_glossary.py
+import pytest
+from ontology_glossary import OntologyGlossary
+
+ONTOLOGY_PATH = "./Polyhouse Ontology.ttl"
+LANGUAGES = ["en-US", "hi-IN", "ta-IN", "te-IN", "ml-IN", "kn-IN"]
+
+@pytest.fixture(scope="module")
+def glossary():
+    return OntologyGlossary.from_ttl(ONTOLOGY_PATH, languages=LANGUAGES)
+
+def terms(result):
+    return {match.term for match in result.matches}
+
+@pytest.mark.parametrize("text", [
+    "data stored yesterday",
+    "check the sensors",
+    "add more spice",
+    "open all the doors",
+])
+def test_ordinary_english_is_not_rewritten_or_skipped(glossary, text):
+    result = glossary.apply(text, "en-US")
+    assert not result.confident
+    assert result.english_text is None
+
+@pytest.mark.parametrize("text", ["check the sensors", "open all the doors"])
+def test_plurals_are_not_fuzzy_matches(glossary, text):
+    result = glossary.apply(text, "en-US")
+    assert all(match.distance == 0 for match in result.matches)
+    assert not {"Sensor", "Door"} & terms(result)
+
+def test_exact_terms_with_command_words_skip_gemini(glossary):
+    result = glossary.apply("open the turbovent", "en-US")
+    assert result.confident
+    assert result.english_text == "open the turbovent"
+
+def test_fuzzy_match_is_only_a_hint(glossary):
+    result = glossary.apply("open the turbo went", "en-US")
+    assert not result.confident
+    assert "Turbovent" in terms(result)
+
+def test_other_languages_never_skip(glossary):
+    assert not glossary.apply("open the turbovent", "hi-IN").confident
+
+@pytest.mark.parametrize("text, language, expected", [
+    ("कैमरा चालू करो", "hi-IN", {"Camera"}),
+    ("ह्यूमिडिटी सेंसर", "hi-IN", {"Humidity", "Sensor"}),
+    ("கேமரா ஆன் பண்ணு", "ta-IN", {"Camera"}),
+])
+def test_native_script_loanwords_match(glossary, text, language, expected):
+    assert expected <= terms(glossary.apply(text, language))
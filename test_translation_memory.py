@@ -0,0 +1,103 @@
+# test_translation_memory.py
+import pytest
+from translation_memory import TranslationMemory
+
+@pytest.fixture
+def memory():
+    memory = TranslationMemory()
+    for text in (
+        "raise the temperature in grid one",
+        "turn on the humidity sensor",
+        "set vent to 30",
+        "set vent to 30 and fan to 40",
+        "open the vent and close the door",
+        "move the camera from grid 1 to grid 2",
+    ):
+        memory.add(text, "en-US", text)
+    return memory
+
+@pytest.mark.parametrize("query", [
+    "raise the temperature in grid two",
+    "turn off the humidity sensor",
+    "set vent to 40",
+    "lower the temperature in grid one",
+    "set vent to 40 and fan to 30",
+    "set fan to 30 and vent to 40",
+    "close the vent and open the door",
+    "open the door and close the vent",
+    "move the camera from grid 2 to grid 1",
+])
+def test_different_numbers_or_polarity_never_match(memory, query):
+    assert memory.lookup(query, "en-US") is None
+
+@pytest.mark.parametrize("query, expected", [
+    ("please raise the temperature in grid 1", "raise the temperature in grid one"),
+    ("turn on the humidity sensor now", "turn on the humidity sensor"),
+    ("can you set the vent to 30", "set vent to 30"),
+    ("please open the vent and close the door now", "open the vent and close the door"),
+    ("plase turn on the humdity sensor", "turn on the humidity sensor"),
+    ("kinly raise the temperature in grid one", "raise the temperature in grid one"),
+])
+def test_near_duplicates_match(memory, query, expected):
+    entry, _ = memory.lookup(query, "en-US")
+    assert entry.english_text == expected
+
+def test_spoken_indic_numbers_are_hard_keys():
+    memory = TranslationMemory()
+    memory.add("ग्रिड एक का तापमान बढ़ाओ", "hi-IN", "raise the temperature in grid one")
+    assert memory.lookup("ग्रिड दो का तापमान बढ़ाओ", "hi-IN") is None
+    assert memory.lookup("ग्रिड 1 का तापमान बढ़ाओ", "hi-IN") is not None
+
+def test_substituted_word_is_not_a_typo():
+    memory = TranslationMemory()
+    memory.add("check the humidity sensor near the ramp in polyhouse marigold", "en-US", "marigold")
+    assert memory.lookup("check the humidity sensor near the ramp in polyhouse marjoram", "en-US") is None
+    entry, _ = memory.lookup("check the humidity sensor near the ramp in polyhouse marigld", "en-US")
+    assert entry.english_text == "marigold"
+
+def test_full_buckets_cap_candidates():
+    memory = TranslationMemory(max_bucket_size=4)
+    for index in range(50):
+        memory.add(f"open the vent in polyhouse note{index:03}", "en-US", str(index))
+    assert all(len(bucket) <= 4 for bucket in memory._buckets.values())
+    entry, _ = memory.lookup("open the vent in polyhouse note049", "en-US")
+    assert entry.english_text == "49"
+
+@pytest.mark.parametrize("source_text", ["Please.", "It is.", "..."])
+def test_transcript_without_features_is_not_stored(source_text):
+    memory = TranslationMemory()
+    assert memory.add(source_text, "en-US", "Please.") is None
+    assert len(memory) == 0
+    assert memory.lookup(source_text, "en-US") is None
+
+def test_english_without_features_is_stored_but_not_indexed():
+    memory = TranslationMemory()
+    memory.add("turn on the fan", "en-US", "It is.")
+    memory.add("open the vent", "en-US", "open the vent")
+    memory.add("open the vent", "en-US", "Please.")
+    assert memory.lookup("turn on the fan", "en-US")[0].english_text == "It is."
+    assert memory.lookup("open the vent", "en-US")[0].english_text == "Please."
+    assert memory.lookup_translation("It is.", "ta") is None
+    assert memory.lookup_translation("open the vent", "ta") is None
+
+def test_import_skips_entries_without_features():
+    memory = TranslationMemory()
+    imported = memory.import_entries([
+        {"source_text": "Please.", "source_lang": "en-US", "english_text": "Please."},
+        {"source_text": "open the vent", "source_lang": "en-US", "english_text": "open the vent"},
+    ])
+    assert imported == 1
+    assert len(memory) == 1
+    assert memory.lookup("open the vent", "en-US") is not None
+
+def test_save_replaces_the_file_atomically(tmp_path):
+    path = tmp_path / "memory.jsonl"
+    path.write_text("stale\n", encoding="utf-8")
+    memory = TranslationMemory()
+    memory.add("open the vent", "en-US", "open the vent", {"ta": "வென்ட்டைத் திற"})
+    assert memory.save(str(path)) == 1
+    assert [p.name for p in tmp_path.iterdir()] == ["memory.jsonl"]
+
+    restored = TranslationMemory()
+    assert restored.load(str(path)) == 1
+    assert restored.lookup_translation("open the vent", "ta")[0] == "வென்ட்டைத் திற"
@@ -0,0 +1,394 @@
+# translation_memory.py
+import json
+import os
+import random
+import tempfile
+import threading
+import unicodedata
+
+# Filler words that don't change what a spoken command means
+STOPWORDS = {
+    "a", "an", "the", "please", "kindly", "can", "could", "you", "would", "will",
+    "is", "are", "to", "of", "and", "now", "just", "me", "for", "it",
+}
+
+def _one_edit_variants(word, alphabet="abcdefghijklmnopqrstuvwxyz"):
+    splits = [(word[:i], word[i:]) for i in range(len(word) + 1)]
+    variants = {head + tail[1:] for head, tail in splits if tail}
+    variants |= {head + ch + tail[1:] for head, tail in splits if tail for ch in alphabet}
+    variants |= {head + ch + tail for head, tail in splits for ch in alphabet}
+    return variants
+
+# Misrecognised spellings of the longer filler words ("plase", "kinly") are filler too.
+# Shorter ones are left alone: one edit from "would" is "world".
+MISHEARD_FILLERS = (_one_edit_variants("please") | _one_edit_variants("kindly")) - {"lease"}
+_DROPPED_WORDS = STOPWORDS | MISHEARD_FILLERS
+
+# Spoken numbers, mapped to digits so "grid one", "grid 1" and "ग्रिड एक" share a key
+NUMBER_WORDS = {
+    "zero": "0", "one": "1", "two": "2", "three": "3", "four": "4", "five": "5",
+    "six": "6", "seven": "7", "eight": "8", "nine": "9", "ten": "10", "eleven": "11",
+    "twelve": "12", "thirteen": "13", "fourteen": "14", "fifteen": "15", "sixteen": "16",
+    "seventeen": "17", "eighteen": "18", "nineteen": "19", "twenty": "20", "thirty": "30",
+    "forty": "40", "fifty": "50", "sixty": "60", "seventy": "70", "eighty": "80",
+    "ninety": "90", "hundred": "100",
+}
+_INDIC_NUMBER_WORDS = {
+    "hi-IN": ["एक", "दो", "तीन", "चार", "पांच", "छह", "सात", "आठ", "नौ", "दस"],
+    "ta-IN": ["ஒன்று", "இரண்டு", "மூன்று", "நான்கு", "ஐந்து", "ஆறு", "ஏழு", "எட்டு", "ஒன்பது", "பத்து"],
+    "te-IN": ["ఒకటి", "రెండు", "మూడు", "నాలుగు", "ఐదు", "ఆరు", "ఏడు", "ఎనిమిది", "తొమ్మిది", "పది"],
+    "ml-IN": ["ഒന്ന്", "രണ്ട്", "മൂന്ന്", "നാല്", "അഞ്ച്", "ആറ്", "ഏഴ്", "എട്ട്", "ഒമ്പത്", "പത്ത്"],
+    "kn-IN": ["ಒಂದು", "ಎರಡು", "ಮೂರು", "ನಾಲ್ಕು", "ಐದು", "ಆರು", "ಏಳು", "ಎಂಟು", "ಒಂಬತ್ತು", "ಹತ್ತು"],
+}
+for _words in _INDIC_NUMBER_WORDS.values():
+    NUMBER_WORDS.update((word, str(value)) for value, word in enumerate(_words, 1))
+NUMBER_WORDS.update({"पाँच": "5", "छः": "6"})
+
+# Words that flip what a command does, mapped to the direction they select
+POLARITY_WORDS = {
+    "on": "on", "enable": "on", "off": "off", "disable": "off",
+    "open": "open", "close": "close", "closed": "close", "shut": "close",
+    "start": "start", "stop": "stop",
+    "increase": "up", "raise": "up", "up": "up", "higher": "up",
+    "decrease": "down", "lower": "down", "reduce": "down", "down": "down",
+    "चालू": "on", "बंद": "off", "खोलो": "open",
+    "ஆன்": "on", "ஆஃப்": "off", "ఆన్": "on", "ఆఫ్": "off",
+    "ഓൺ": "on", "ഓഫ്": "off", "ಆನ್": "on", "ಆಫ್": "off",
+}
+
+# Hashes are kept below 2**30 so the XOR/min loop stays on small ints
+_HASH_MASK = (1 << 30) - 1
+
+# Namespace under which entries are also indexed by their English text
+ENGLISH = "en"
+
+def normalize(text):
+    """Lower-cases text, strips punctuation and filler words, spells numbers as digits and returns the tokens."""
+    tokens = []
+    for raw in text.split():
+        token = "".join(ch for ch in raw if not unicodedata.category(ch).startswith("P")).lower()
+        if token and token not in _DROPPED_WORDS:
+            tokens.append(NUMBER_WORDS.get(token, token))
+    return tokens
+
+def features(text):
+    """Tokens plus character trigrams, so both reordering and small misspellings stay similar."""
+    return _token_features(normalize(text))
+
+def _token_features(tokens):
+    found = set()
+    for token in tokens:
+        found.add(token)
+        padded = f"#{token}#"
+        found.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(found)
+
+def hard_keys(text):
+    """Numbers and polarity words in utterance order, which must match exactly.
+
+    "set vent to 30" never reuses "set vent to 40", "grid one" never reuses
+    "grid two", and "turn on the fan" never reuses "turn off the fan". Order
+    counts too: "from grid 2 to grid 1" never reuses "from grid 1 to grid 2".
+    """
+    return _token_hard_keys(normalize(text))[0]
+
+def _is_hard(token):
+    return token.isdigit() or token in POLARITY_WORDS
+
+def _token_hard_keys(tokens):
+    """Returns the hard keys in utterance order and, for each, the word it applies to.
+
+    A number applies to the word before it ("vent 30", "grid 2") and a polarity
+    word to the word after it ("open vent", "turn on fan"), falling back to the
+    other side at the end of the utterance ("fan on").
+    """
+    keys = []
+    targets = []
+    for i, token in enumerate(tokens):
+        before = range(i - 1, -1, -1)
+        after = range(i + 1, len(tokens))
+        if token.isdigit():
+            keys.append(token)
+            order = (before, after)
+        elif token in POLARITY_WORDS:
+            keys.append(POLARITY_WORDS[token])
+            order = (after, before)
+        else:
+            continue
+        targets.append(next((tokens[j] for side in order for j in side if not _is_hard(tokens[j])), ""))
+    return tuple(keys), tuple(targets)
+
+def _analyse(kind, text):
+    """Returns the (index key, feature set, word set, hard-key targets) of a text.
+
+    Entries are only compared within one key.
+    """
+    tokens = normalize(text)
+    keys, targets = _token_hard_keys(tokens)
+    return (kind, keys), _token_features(tokens), frozenset(tokens), targets
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+def _edit_distance(a, b):
+    prev_row = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        row = [i]
+        for j, cb in enumerate(b, 1):
+            row.append(min(row[j - 1] + 1, prev_row[j] + 1, prev_row[j - 1] + (ca != cb)))
+        prev_row = row
+    return prev_row[-1]
+
+def _typo_budget(a, b):
+    """Edits two spellings of one word may differ by; short words must match exactly."""
+    length = max(len(a), len(b))
+    if length <= 3:
+        return 0
+    if length <= 9:
+        return 1
+    return 2
+
+def same_words(a, b):
+    """Whether two word sets differ only by misspellings, pairing each differing word with one on the other side.
+
+    Trigram similarity alone lets a different word through when the rest of the
+    utterance is long enough ("open the vent in grid kalo" vs "... kalomi").
+    """
+    extra_a = a - b
+    extra_b = set(b - a)
+    if len(extra_a) != len(extra_b):
+        return False
+    for word in extra_a:
+        match = next((other for other in extra_b if _same_spelling(word, other)), None)
+        if match is None:
+            return False
+        extra_b.remove(match)
+    return True
+
+def _same_spelling(a, b):
+    return a == b or _edit_distance(a, b) <= _typo_budget(a, b)
+
+def same_targets(a, b):
+    """Whether each hard key applies to the same word (up to misspellings) in both utterances.
+
+    "open the vent and close the door" has the same words and hard keys as
+    "open the door and close the vent", but not the same targets.
+    """
+    return len(a) == len(b) and all(_same_spelling(x, y) for x, y in zip(a, b))
+
+class MemoryEntry:
+    """One remembered (source transcript, English, target translations) triple."""
+
+    def __init__(self, source_text, source_lang, english_text, translations=None):
+        self.source_text = source_text
+        self.source_lang = source_lang
+        self.english_text = english_text
+        self.translations = dict(translations or {})
+
+    def to_dict(self):
+        return {
+            "source_text": self.source_text,
+            "source_lang": self.source_lang,
+            "english_text": self.english_text,
+            "translations": self.translations,
+        }
+
+class TranslationMemory:
+    """Fuzzy translation memory indexed with MinHash locality-sensitive hashing.
+
+    Each entry is indexed twice: by its source transcript (per source language)
+    and by its English text, and only utterances with the same numbers and
+    polarity words (on/off, open/close, ...) in the same order, each applying to
+    the same word, are compared. A lookup hashes the query into `bands` buckets,
+    collects the entries sharing any bucket and returns the best one whose exact
+    Jaccard similarity reaches `threshold` and whose differing words are only
+    misspellings of the query's. Buckets hold at most `max_bucket_size` entries,
+    so a lookup verifies at most `bands * max_bucket_size` candidates however
+    many similar utterances the memory holds; an entry that finds all its
+    buckets full is still reachable through the exact index.
+    """
+
+    def __init__(self, threshold=0.7, num_perm=32, bands=8, max_bucket_size=16, seed=1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.threshold = threshold
+        self.bands = bands
+        self.max_bucket_size = max_bucket_size
+        self.rows = num_perm // bands
+        # XOR with a random mask stands in for each hash permutation; it keeps signatures cheap
+        rng = random.Random(seed)
+        self._masks = [rng.getrandbits(30) for _ in range(num_perm)]
+        self._entries = []
+        self._features = {}
+        self._buckets = {}
+        self._exact = {}
+        self._by_english = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _signature(self, feats):
+        hashes = [hash(feature) & _HASH_MASK for feature in feats]
+        return [min(map(mask.__xor__, hashes)) for mask in self._masks]
+
+    def _band_keys(self, key, feats):
+        signature = self._signature(feats)
+        rows = self.rows
+        return [
+            (key, band, tuple(signature[band * rows:(band + 1) * rows]))
+            for band in range(self.bands)
+        ]
+
+    def _prepare(self, kind, analysis):
+        """Computes everything needed to index an analysed text, or None when it has no features.
+
+        Nothing is modified, so a failure here can't leave a half-indexed entry behind.
+        """
+        key, feats, _, _ = analysis
+        if not feats:
+            return None
+        return kind, analysis, self._band_keys(key, feats)
+
+    def _index(self, prepared, entry_id):
+        """Indexes an entry's source transcript (kind = source language) or English text (kind = ENGLISH)."""
+        kind, (key, feats, words, targets), band_keys = prepared
+        self._features[(kind, entry_id)] = (key, feats, words, targets)
+        self._exact.setdefault((key, targets, feats), entry_id)
+        for band_key in band_keys:
+            bucket = self._buckets.setdefault(band_key, [])
+            if len(bucket) < self.max_bucket_size:
+                bucket.append(entry_id)
+
+    def _unindex(self, kind, entry_id):
+        indexed = self._features.pop((kind, entry_id), None)
+        if indexed is None:
+            return
+        key, feats, _, targets = indexed
+        if self._exact.get((key, targets, feats)) == entry_id:
+            del self._exact[(key, targets, feats)]
+
+    def _search(self, kind, text):
+        key, feats, words, targets = _analyse(kind, text)
+        if not feats:
+            return None
+
+        entry_id = self._exact.get((key, targets, feats))
+        if entry_id is not None:
+            return self._entries[entry_id], 1.0
+
+        candidates = set()
+        for band_key in self._band_keys(key, feats):
+            candidates.update(self._buckets.get(band_key, ()))
+
+        best = None
+        for candidate in candidates:
+            indexed = self._features.get((kind, candidate))
+            if indexed is None or indexed[0] != key:
+                continue  # Stale bucket left behind when an entry's English text changed
+            candidate_key, candidate_feats, candidate_words, candidate_targets = indexed
+            similarity = jaccard(feats, candidate_feats)
+            if similarity < self.threshold or (best is not None and similarity <= best[1]):
+                continue
+            if same_words(words, candidate_words) and same_targets(targets, candidate_targets):
+                best = (self._entries[candidate], similarity)
+        return best
+
+    def lookup(self, source_text, source_lang):
+        """Returns (entry, similarity) for the closest remembered transcript, or None."""
+        with self._lock:
+            return self._search(source_lang, source_text)
+
+    def lookup_translation(self, english_text, target_lang):
+        """Returns (translated_text, similarity) for the closest English text already translated to target_lang."""
+        with self._lock:
+            hit = self._search(ENGLISH, english_text)
+        if hit and target_lang in hit[0].translations:
+            return hit[0].translations[target_lang], hit[1]
+        return None
+
+    def add(self, source_text, source_lang, english_text, translations=None):
+        """Remembers a translation; an identical normalized transcript updates the existing entry.
+
+        Returns the entry, or None when the transcript is only filler words or
+        punctuation ("Please.") and there is nothing to match it by. English text
+        without features is stored but not indexed for target-translation reuse.
+        """
+        with self._lock:
+            source = _analyse(source_lang, source_text)
+            key, feats, _, targets = source
+            if not feats:
+                return None
+
+            entry_id = self._exact.get((key, targets, feats))
+            if entry_id is not None:
+                entry = self._entries[entry_id]
+                if entry.english_text != english_text:
+                    english = self._prepare(ENGLISH, _analyse(ENGLISH, english_text))
+                    self._unindex(ENGLISH, entry_id)
+                    self._by_english[entry.english_text].remove(entry_id)
+                    entry.english_text = english_text
+                    entry.translations = {}
+                    self._by_english.setdefault(english_text, []).append(entry_id)
+                    if english is not None:
+                        self._index(english, entry_id)
+                entry.translations.update(translations or {})
+                return entry
+
+            source = self._prepare(source_lang, source)
+            english = self._prepare(ENGLISH, _analyse(ENGLISH, english_text))
+            entry = MemoryEntry(source_text, source_lang, english_text, translations)
+            entry_id = len(self._entries)
+            self._index(source, entry_id)
+            if english is not None:
+                self._index(english, entry_id)
+            self._by_english.setdefault(english_text, []).append(entry_id)
+            self._entries.append(entry)
+            return entry
+
+    def add_translation(self, english_text, target_lang, translated_text):
+        """Attaches a target-language translation to every entry with exactly this English text."""
+        with self._lock:
+            for entry_id in self._by_english.get(english_text, ()):
+                self._entries[entry_id].translations[target_lang] = translated_text
+
+    def import_entries(self, entries):
+        """Bulk-loads entries given as dicts with source_text, source_lang, english_text and translations.
+
+        Returns the number of entries stored; transcripts with nothing to match on are skipped.
+        """
+        count = 0
+        for item in entries:
+            entry = self.add(item["source_text"], item["source_lang"], item["english_text"], item.get("translations"))
+            count += entry is not None
+        return count
+
+    def export_entries(self):
+        with self._lock:
+            return [entry.to_dict() for entry in self._entries]
+
+    def load(self, path):
+        """Imports entries from a JSON Lines file."""
+        with open(path, "r", encoding="utf-8") as f:
+            return self.import_entries(json.loads(line) for line in f if line.strip())
+
+    def save(self, path):
+        """Exports all entries to a JSON Lines file.
+
+        The file is written under a temporary name and then renamed over `path`, so
+        readers and concurrent savers never see a partly written file.
+        """
+        entries = self.export_entries()
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                for entry in entries:
+                    f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+        return len(entries)